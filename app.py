@@ -1,8 +1,8 @@
+import math
+
 import streamlit as st
-import pandas as pd
 import numpy as np
 import xgboost as xgb
-from matplotlib import pyplot as plt
 
 # -------------------------------
 # Load Model
@@ -11,6 +11,10 @@ from matplotlib import pyplot as plt
 def load_model():
     model = xgb.Booster()
     model.load_model("model/safe_model.json")   # Your model path
+    # One row per request: threading overhead outweighs the tree traversal
+    model.set_param({"nthread": 1})
+    # Warm-up prediction so the first user submit doesn't pay cold-start costs
+    model.inplace_predict(np.zeros((1, model.num_features()), dtype=np.float32))
     return model
 
 model = load_model()
@@ -37,12 +41,19 @@ st.write("---")
 # -------------------------------
 st.subheader("Discharge Assessment Form")
 
+# Model encodings → display labels (you’ll adjust based on your dataset).
+# Widgets return the encoded value directly via format_func.
+RACE_LABELS = {1:"Caucasian", 2:"African American", 3:"Asian", 4:"Hispanic", 5:"Other"}
+GENDER_LABELS = {1:"Male", 0:"Female"}
+DISCHARGE_LABELS = {1:"Home", 2:"Rehab", 3:"Home Health", 4:"SNF / Nursing Facility", 5:"Other"}
+MED_CHANGE_LABELS = {1:"Yes", 0:"No"}
+
 with st.form("clinical_form"):
     age = st.slider("Patient Age", 18, 90, 60)
 
-    race = st.selectbox("Race", ["Caucasian", "African American", "Asian", "Hispanic", "Other"])
+    race = st.selectbox("Race", list(RACE_LABELS), format_func=RACE_LABELS.get)
 
-    gender = st.selectbox("Gender", ["Male", "Female"])
+    gender = st.selectbox("Gender", list(GENDER_LABELS), format_func=GENDER_LABELS.get)
 
     time_in_hospital = st.slider("Length of Stay (days)", 1, 30, 4)
 
@@ -54,11 +65,11 @@ with st.form("clinical_form"):
 
     number_inpatient = st.slider("Prior Inpatient Visits (12 months)", 0, 10, 0)
 
-    discharge_type = st.selectbox("Discharge Destination", [
-        "Home", "Rehab", "Home Health", "SNF / Nursing Facility", "Other"
-    ])
+    discharge_type = st.selectbox("Discharge Destination", list(DISCHARGE_LABELS),
+                                  format_func=DISCHARGE_LABELS.get)
 
-    med_change = st.selectbox("Medication Changed During Visit?", ["Yes", "No"])
+    med_change = st.selectbox("Medication Changed During Visit?", list(MED_CHANGE_LABELS),
+                              format_func=MED_CHANGE_LABELS.get)
 
     submitted = st.form_submit_button("Predict Risk")
 
@@ -66,50 +77,80 @@ with st.form("clinical_form"):
 # Mapping UI → Model Features
 # -------------------------------
 
-def encode_inputs():
-    # Basic encodings (you’ll adjust based on your dataset)
-    race_map = {"Caucasian":1, "African American":2, "Asian":3, "Hispanic":4, "Other":5}
-    gender_map = {"Male":1, "Female":0}
-    discharge_map = {"Home":1, "Rehab":2, "Home Health":3, "SNF / Nursing Facility":4, "Other":5}
-    med_change_map = {"Yes":1, "No":0}
-
-    return pd.DataFrame([{
-        "age": age,
-        "race": race_map[race],
-        "gender": gender_map[gender],
-        "time_in_hospital": time_in_hospital,
-        "num_lab_procedures": num_lab_procedures,
-        "num_procedures": num_procedures,
-        "num_medications": num_medications,
-        "number_outpatient": 0,      # Hidden for now
-        "number_inpatient": number_inpatient,
-        "number_emergency": 0,        # Hidden for now
-        "admission_type_id": 1,
-        "discharge_disposition_id": discharge_map[discharge_type],
-        "admission_source_id": 1,
-        "diag_1": 1,
-        "diag_2": 1,
-        "diag_3": 1,
-        "A1Cresult": 0,
-        "diabetesMed": 1,
-        "insulin": 1,
-        "change": med_change_map[med_change],
-        "had_prior_visit": 1 if number_inpatient > 0 else 0,
-        "total_visits": number_inpatient,
-        "procedure_per_day": num_procedures / max(time_in_hospital, 1),
-        "age_group_numeric": age,
-        "gender_race_combo": (gender_map[gender] * 10) + race_map[race]
-    }])
+# Column order the model was trained on (see model/safe_model.json)
+FEATURE_ORDER = (
+    "age", "race", "gender", "time_in_hospital", "num_lab_procedures",
+    "num_procedures", "num_medications", "number_outpatient", "number_inpatient",
+    "number_emergency", "admission_type_id", "discharge_disposition_id",
+    "admission_source_id", "diag_1", "diag_2", "diag_3", "A1Cresult",
+    "diabetesMed", "insulin", "change", "had_prior_visit", "total_visits",
+    "procedure_per_day", "age_group_numeric", "gender_race_combo",
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_ORDER)}
+
+# Fixed values for features not collected on the form
+DEFAULT_FEATURES = {
+    "number_outpatient": 0,      # Hidden for now
+    "number_emergency": 0,       # Hidden for now
+    "admission_type_id": 1,
+    "admission_source_id": 1,
+    "diag_1": 1,
+    "diag_2": 1,
+    "diag_3": 1,
+    "A1Cresult": 0,
+    "diabetesMed": 1,
+    "insulin": 1,
+}
+
+# Single C-contiguous float32 row so inplace_predict skips DMatrix construction;
+# built once and copied per submit, only the form-driven slots are overwritten
+_TEMPLATE = np.zeros((1, len(FEATURE_ORDER)), dtype=np.float32)
+for _name, _value in DEFAULT_FEATURES.items():
+    _TEMPLATE[0, FEATURE_INDEX[_name]] = _value
+_TEMPLATE.flags.writeable = False
+
+def encode_inputs(age, race, gender, time_in_hospital, num_lab_procedures,
+                  num_procedures, num_medications, number_inpatient,
+                  discharge_type, med_change):
+    X = _TEMPLATE.copy()
+    row = X[0]
+    row[FEATURE_INDEX["age"]] = age
+    row[FEATURE_INDEX["race"]] = race
+    row[FEATURE_INDEX["gender"]] = gender
+    row[FEATURE_INDEX["time_in_hospital"]] = time_in_hospital
+    row[FEATURE_INDEX["num_lab_procedures"]] = num_lab_procedures
+    row[FEATURE_INDEX["num_procedures"]] = num_procedures
+    row[FEATURE_INDEX["num_medications"]] = num_medications
+    row[FEATURE_INDEX["number_inpatient"]] = number_inpatient
+    row[FEATURE_INDEX["discharge_disposition_id"]] = discharge_type
+    row[FEATURE_INDEX["change"]] = med_change
+    row[FEATURE_INDEX["had_prior_visit"]] = 1 if number_inpatient > 0 else 0
+    row[FEATURE_INDEX["total_visits"]] = number_inpatient
+    row[FEATURE_INDEX["procedure_per_day"]] = num_procedures / max(time_in_hospital, 1)
+    row[FEATURE_INDEX["age_group_numeric"]] = age
+    row[FEATURE_INDEX["gender_race_combo"]] = (gender * 10) + race
+    return X
 
 # -------------------------------
 # Model Prediction
 # -------------------------------
 
-if submitted:
-    X = encode_inputs()
-    dmatrix = xgb.DMatrix(X)
+# The form has a small input space, so repeat submits are served from cache
+@st.cache_data(max_entries=256)
+def predict_risk(age, race, gender, time_in_hospital, num_lab_procedures,
+                 num_procedures, num_medications, number_inpatient,
+                 discharge_type, med_change):
+    X = encode_inputs(age, race, gender, time_in_hospital, num_lab_procedures,
+                      num_procedures, num_medications, number_inpatient,
+                      discharge_type, med_change)
+    # Raw logit + sigmoid in Python skips the objective's transform and an array copy
+    margin = float(model.inplace_predict(X, predict_type="margin")[0])
+    return 1.0 / (1.0 + math.exp(-margin))
 
-    prob = model.predict(dmatrix)[0]
+if submitted:
+    prob = predict_risk(age, race, gender, time_in_hospital, num_lab_procedures,
+                        num_procedures, num_medications, number_inpatient,
+                        discharge_type, med_change)
     risk_index = int(prob * 100)
 
     # Color classification